@@ -0,0 +1,109 @@
+"""
+Database
+
+SQLite storage for patient records, accessed through aiosqlite.
+"""
+
+import json
+from pathlib import Path
+from typing import Optional
+
+import aiosqlite
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+DB_PATH = DATA_DIR / "patients.db"
+
+# Records from the old file-based store are imported on first startup
+LEGACY_PATIENTS_FILE = DATA_DIR / "patients.json"
+
+_connection: Optional[aiosqlite.Connection] = None
+
+
+async def init_db(path: Path = DB_PATH) -> None:
+    """Open the shared connection and create the schema if needed."""
+    global _connection
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    _connection = await aiosqlite.connect(path)
+    _connection.row_factory = aiosqlite.Row
+
+    # WAL lets readers proceed while a write is in progress
+    await _connection.execute("PRAGMA journal_mode=WAL")
+    await _connection.execute("PRAGMA synchronous=NORMAL")
+    await _connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS patients (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            notes TEXT,
+            created_at TEXT NOT NULL
+        )
+        """
+    )
+    await _connection.commit()
+    await _import_legacy_patients(_connection)
+
+
+async def close_db() -> None:
+    """Close the shared connection."""
+    global _connection
+    if _connection is not None:
+        await _connection.close()
+        _connection = None
+
+
+def get_db() -> aiosqlite.Connection:
+    """Return the shared connection opened by init_db."""
+    if _connection is None:
+        raise RuntimeError("Database has not been initialized")
+    return _connection
+
+
+async def _import_legacy_patients(db: aiosqlite.Connection) -> None:
+    """
+    Copy patients from the old patients.json into a table that has never
+    been used.
+
+    Runs in one BEGIN IMMEDIATE transaction, so when several workers start
+    at once only the first imports and the others see its rows.
+    """
+    if not LEGACY_PATIENTS_FILE.exists():
+        return
+
+    with open(LEGACY_PATIENTS_FILE, "r") as f:
+        data = json.load(f)
+
+    await db.execute("BEGIN IMMEDIATE")
+    try:
+        # A sqlite_sequence row means ids have been handed out (or a previous
+        # import ran) even if every patient has since been deleted
+        async with db.execute(
+            "SELECT (SELECT COUNT(*) FROM patients)"
+            " + (SELECT COUNT(*) FROM sqlite_sequence WHERE name = 'patients')"
+        ) as cursor:
+            (used,) = await cursor.fetchone()
+        if used:
+            await db.rollback()
+            return
+
+        await db.executemany(
+            "INSERT INTO patients (id, name, notes, created_at) VALUES (?, ?, ?, ?)",
+            [(p["id"], p["name"], p.get("notes"), p["created_at"]) for p in data["patients"]]
+        )
+        # Keep ids of deleted patients from being handed out again. With no
+        # patients to insert there's no sqlite_sequence row yet to update;
+        # sqlite_sequence has no unique key, so INSERT OR REPLACE would add a
+        # second row rather than replace, hence the explicit fallback.
+        cursor = await db.execute(
+            "UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'patients'",
+            (data["next_id"] - 1,)
+        )
+        if cursor.rowcount == 0 and data["next_id"] > 1:
+            await db.execute(
+                "INSERT INTO sqlite_sequence (name, seq) VALUES ('patients', ?)",
+                (data["next_id"] - 1,)
+            )
+        await db.commit()
+    except BaseException:
+        await db.rollback()
+        raise
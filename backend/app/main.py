@@ -4,11 +4,21 @@ Iridology Analyzer - FastAPI Backend
 Main application entry point.
 """
 
-from fastapi import FastAPI
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Tuple
+
+import orjson
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 
+from .db import init_db, close_db
 from .routers import analysis_router, patients_router
+from .routers.analysis import warm_up_agents
+from .services.image_processor import init_worker
 
 # Load environment variables
 load_dotenv()
@@ -29,24 +39,33 @@ app = FastAPI(
 )
 
 # Configure CORS for frontend
-import os
-allowed_origins = [
-    "http://localhost:5173",
-    "http://localhost:3000",
-    "http://127.0.0.1:5173",
-    "https://iris-analyzer.vercel.app",
-    "https://iris-analyzer-kck321-specs-projects.vercel.app",
-]
-# Add production frontend URL from environment
-if os.getenv("FRONTEND_URL"):
-    allowed_origins.append(os.getenv("FRONTEND_URL"))
-# Allow all origins in production if explicitly set (for flexibility)
-if os.getenv("ALLOW_ALL_ORIGINS", "").lower() == "true":
-    allowed_origins = ["*"]
+def get_allowed_origins() -> Tuple[str, ...]:
+    """
+    Resolve the CORS origin list from the environment.
+
+    Called once, when the CORS middleware is added at import; the middleware
+    keeps its own copy, so changes to the environment after that don't apply.
+    """
+    # Allow all origins in production if explicitly set (for flexibility)
+    if os.getenv("ALLOW_ALL_ORIGINS", "").lower() == "true":
+        return ("*",)
+
+    allowed_origins = [
+        "http://localhost:5173",
+        "http://localhost:3000",
+        "http://127.0.0.1:5173",
+        "https://iris-analyzer.vercel.app",
+        "https://iris-analyzer-kck321-specs-projects.vercel.app",
+    ]
+    # Add production frontend URL from environment
+    if os.getenv("FRONTEND_URL"):
+        allowed_origins.append(os.getenv("FRONTEND_URL"))
+    return tuple(allowed_origins)
+
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=allowed_origins,
+    allow_origins=get_allowed_origins(),
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -57,44 +76,85 @@ app.include_router(analysis_router)
 app.include_router(patients_router)
 
 
+@app.on_event("startup")
+async def startup():
+    """Open the patient database, start the OpenCV process pool and warm up the agents."""
+    await init_db()
+    # Spawn rather than fork: the server process already has threads running
+    cv_workers = int(os.getenv("CV_WORKERS", os.cpu_count() or 1))
+    app.state.cv_pool = ProcessPoolExecutor(
+        max_workers=cv_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+        initargs=(cv_workers,)
+    )
+    # In the background, so startup doesn't wait on it
+    app.state.agent_warm_up = asyncio.create_task(asyncio.to_thread(warm_up_agents))
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Close the patient database and stop the OpenCV process pool."""
+    app.state.cv_pool.shutdown(cancel_futures=True)
+    await close_db()
+
+
+# Static responses are encoded once at import instead of on every hit;
+# /health in particular is polled by the load balancer.
+_ROOT_BYTES = orjson.dumps({
+    "name": "Iridology Analyzer API",
+    "version": "1.0.0",
+    "doctors": [
+        {
+            "name": "Ignaz von Peczely",
+            "years": "1826-1911",
+            "focus": "Historical/Foundational Iridology"
+        },
+        {
+            "name": "Bernard Jensen",
+            "years": "1908-2001",
+            "focus": "Comprehensive Constitutional Analysis"
+        },
+        {
+            "name": "Dr. Robert Morse, ND",
+            "years": "Active",
+            "focus": "Naturopathic/Detoxification Approach"
+        }
+    ],
+    "endpoints": {
+        "analyze_all": "POST /api/analysis/analyze",
+        "analyze_single": "POST /api/analysis/analyze/{doctor}",
+        "analyze_stream": "POST /api/analysis/analyze/stream",
+        "analyze_batch": "POST /api/analysis/analyze-batch",
+        "process_image": "POST /api/analysis/process-image",
+        "patients": "/api/patients/"
+    }
+})
+_HEALTH_BYTES = orjson.dumps({"status": "healthy"})
+
+
 @app.get("/")
 async def root():
     """API root endpoint."""
-    return {
-        "name": "Iridology Analyzer API",
-        "version": "1.0.0",
-        "doctors": [
-            {
-                "name": "Ignaz von Peczely",
-                "years": "1826-1911",
-                "focus": "Historical/Foundational Iridology"
-            },
-            {
-                "name": "Bernard Jensen",
-                "years": "1908-2001",
-                "focus": "Comprehensive Constitutional Analysis"
-            },
-            {
-                "name": "Dr. Robert Morse, ND",
-                "years": "Active",
-                "focus": "Naturopathic/Detoxification Approach"
-            }
-        ],
-        "endpoints": {
-            "analyze_all": "POST /api/analysis/analyze",
-            "analyze_single": "POST /api/analysis/analyze/{doctor}",
-            "process_image": "POST /api/analysis/process-image",
-            "patients": "/api/patients/"
-        }
-    }
+    return Response(content=_ROOT_BYTES, media_type="application/json")
 
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "healthy"}
+    return Response(content=_HEALTH_BYTES, media_type="application/json")
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # With uvicorn[standard] installed, "auto" selects uvloop and httptools
+    # (uvloop isn't available on Windows, where asyncio/h11 are used instead).
+    # Multiple workers need the app as an import string.
+    uvicorn.run(
+        "app.main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="auto",
+        http="auto",
+        workers=int(os.getenv("WEB_CONCURRENCY", "1"))
+    )
@@ -51,6 +51,14 @@ class AnalysisResult(BaseModel):
     created_at: datetime
 
 
+class BatchAnalysisCase(BaseModel):
+    """One patient in a batch analysis manifest"""
+    patient_name: str
+    notes: Optional[str] = None
+    left_iris: Optional[str] = None  # filename of an uploaded image
+    right_iris: Optional[str] = None
+
+
 class AnalysisRequest(BaseModel):
     patient_name: str
     notes: Optional[str] = None
@@ -4,22 +4,350 @@ Analysis Router
 Handles iris image upload and analysis endpoints.
 """
 
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from typing import Optional
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from typing import Any, AsyncIterator, Dict, Hashable, List, Optional, Sequence, Tuple, Union
+from cachetools import TTLCache
+from pydantic import TypeAdapter, ValidationError
+import asyncio
+from contextlib import asynccontextmanager
+from functools import cache
 import json
-
-from ..services.image_processor import IrisImageProcessor
+import logging
+import mmap
+import os
+import orjson
+
+from ..models.schemas import BatchAnalysisCase
+from ..services.hashing import content_hash, hash_parts
+from ..services.image_processor import DISPLAY_FORMATS, run_in_worker
 from ..services.llm_agents import IridologyAgentManager
 
-router = APIRouter(prefix="/api/analysis", tags=["analysis"])
+logger = logging.getLogger(__name__)
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson.
+
+    Analysis endpoints return this directly so the large feature dicts
+    (which hold NumPy scalars) skip FastAPI's jsonable_encoder pass.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+def _sse_event(event: str, data: Any) -> bytes:
+    """Format one Server-Sent Events message with a JSON payload."""
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data, option=ORJSON_OPTIONS) + b"\n\n"
+
+
+async def _close_upload_maps(request: Request) -> AsyncIterator[None]:
+    """
+    Router dependency that closes the upload memory maps _read_upload made
+    once the request has been handled.
+    """
+    maps: List[Tuple[mmap.mmap, memoryview]] = []
+    request.state.upload_maps = maps
+    try:
+        yield
+    finally:
+        for mapping, view in maps:
+            try:
+                view.release()
+                mapping.close()
+            except BufferError:
+                # Something still holds a slice of it; it's freed with that
+                logger.debug("Upload mapping still in use, left to the garbage collector")
+
+
+router = APIRouter(prefix="/api/analysis", tags=["analysis"], default_response_class=ORJSONResponse,
+                   dependencies=[Depends(_close_upload_maps)])
+
+# Image processing runs in the app's process pool; the agent manager is
+# created on first use (or by warm_up_agents at startup), not at import
+@cache
+def get_agent_manager() -> IridologyAgentManager:
+    return IridologyAgentManager()
+
+
+def warm_up_agents() -> None:
+    """
+    Create the doctor agents (API client, methodology files) ahead of the
+    first request. Runs in a thread from the app's startup hook.
+    """
+    manager = get_agent_manager()
+    try:
+        for doctor in ALL_DOCTORS:
+            getattr(manager, f"{doctor}_agent")
+    except ValueError as e:
+        # Missing API key: requests will report it, the server still starts
+        logger.warning("Skipped agent warm-up: %s", e)
+
+
+ALL_DOCTORS = ("peczely", "jensen", "morse")
+
+# Uploads are read in 1 MB chunks and rejected past 25 MB
+UPLOAD_CHUNK_SIZE = 1 << 20
+MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+
+# Batch analysis: at most 8 cases talk to the LLM at once (each case runs
+# the three doctors), and a batch holds at most 50 cases and 200 MB of images
+BATCH_CONCURRENCY = 8
+MAX_BATCH_CASES = 50
+MAX_BATCH_BYTES = 200 * 1024 * 1024
+
+_batch_manifest_adapter = TypeAdapter(List[BatchAnalysisCase])
+
+# Doctor analyses keyed by a hash of the uploaded images and patient details.
+# UI retries and repeat submissions of the same case are answered from here
+# instead of re-running every LLM call.
+_analysis_cache: TTLCache = TTLCache(maxsize=256, ttl=3600)
+# One lock per key with a request holding or waiting on it; the count of
+# those requests decides when the lock can be dropped
+_analysis_locks: Dict[str, asyncio.Lock] = {}
+_analysis_lock_users: Dict[str, int] = {}
+
+# Image pipeline results keyed by (image hash, pipeline method, parameters).
+# The UI often sends the same image to process, annotate, preprocess and
+# analyze in quick succession; only the first call does the CV work.
+_image_cache: TTLCache = TTLCache(maxsize=64, ttl=600)
+
+
+def _image_key(image_data: bytes) -> bytes:
+    """Hash uploaded image bytes for the image cache."""
+    return content_hash(image_data)
+
+
+def _analysis_cache_key(left_image: Optional[bytes], right_image: Optional[bytes],
+                        patient_name: str, notes: Optional[str],
+                        doctors: Sequence[str]) -> str:
+    """Hash the inputs that determine the doctor analyses for a request."""
+    return hash_parts((left_image or b"", right_image or b"", patient_name.encode(),
+                       (notes or "").encode(), ",".join(doctors).encode()))
+
+
+def _map_upload(request: Request, upload: UploadFile) -> Optional[memoryview]:
+    """
+    Memory-map an upload that Starlette has spooled to a temporary file.
+
+    Returns None for uploads still held in memory (under 1 MB), where a
+    plain read is just as cheap. The mapping is closed by _close_upload_maps
+    when the request is done.
+    """
+    # A SpooledTemporaryFile only has a name once it has rolled over to disk
+    # (asking for its fileno would force that rollover)
+    if getattr(upload.file, "name", None) is None:
+        return None
+    try:
+        upload.file.flush()
+        fileno = upload.file.fileno()
+        size = os.fstat(fileno).st_size
+        if not size:
+            return None
+        mapping = mmap.mmap(fileno, size, access=mmap.ACCESS_READ)
+    except (AttributeError, OSError, ValueError):
+        return None
+    view = memoryview(mapping)
+    request.state.upload_maps.append((mapping, view))
+    return view
+
+
+async def _read_upload(request: Request, upload: UploadFile,
+                       chunk_size: int = UPLOAD_CHUNK_SIZE) -> Union[bytes, memoryview]:
+    """
+    Read an upload in chunks, yielding to the event loop between them.
+
+    Large uploads are memory-mapped instead, so hashing, ETag checks and
+    cache hits don't copy them onto the heap; _run_in_pool copies them to
+    bytes only when they have to be sent to a worker.
 
-# Initialize services
-image_processor = IrisImageProcessor()
-agent_manager = IridologyAgentManager()
+    Raises 413 once the upload exceeds MAX_UPLOAD_BYTES.
+    """
+    if upload.size is not None and upload.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Image upload is too large")
+
+    mapped = _map_upload(request, upload)
+    if mapped is not None:
+        if len(mapped) > MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail="Image upload is too large")
+        return mapped
+
+    buffer = bytearray()
+    while chunk := await upload.read(chunk_size):
+        buffer.extend(chunk)
+        if len(buffer) > MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail="Image upload is too large")
+    return bytes(buffer)
+
+
+async def _run_in_pool(request: Request, method: str, *args):
+    """
+    Run an IrisImageProcessor method in the app's OpenCV process pool.
+
+    The pool is created on startup (see main.py) so CPU-bound preprocessing
+    and feature extraction run in parallel without holding up the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    # Memory-mapped uploads can't be pickled; workers get a copy of the bytes.
+    # Anything else bytes-like is also sent as bytes, since a worker may hand
+    # its input straight back as a response body.
+    args = tuple(bytes(arg) if isinstance(arg, (bytearray, memoryview)) else arg for arg in args)
+    return await loop.run_in_executor(request.app.state.cv_pool, run_in_worker, method, *args)
+
+
+async def _run_cached(request: Request, key: Hashable, method: str, *args):
+    """Run a pool method unless its result for key is already in the image cache."""
+    result = _image_cache.get(key)
+    if result is None:
+        result = await _run_in_pool(request, method, *args)
+        # Undecodable images return None; don't cache those
+        if result is not None:
+            _image_cache[key] = result
+    return result
+
+
+async def _image_features(request: Request, image_data: bytes, image_key: bytes,
+                          eye_side: str) -> Dict:
+    """Extract features from an uploaded image, using the image cache."""
+    return await _run_cached(request, (image_key, "features", eye_side),
+                             "process_image_sync", image_data, eye_side)
+
+
+def _display_format(request: Request) -> str:
+    """Pick WebP when the client accepts it, otherwise JPEG."""
+    return "webp" if "image/webp" in request.headers.get("accept", "") else "jpeg"
+
+
+def _display_etag(image_key: bytes, *params: Any) -> str:
+    """ETag for a display image: a hash of the upload and everything that shapes the output."""
+    return '"' + hash_parts([image_key, *(str(param).encode() for param in params)]) + '"'
+
+
+def _display_headers(etag: str) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": "private, max-age=3600", "Vary": "Accept"}
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """Check the request's If-None-Match header against etag."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=_display_headers(etag))
+
+
+def _display_response(content: bytes, image_format: str, etag: str) -> Response:
+    """Return an encoded display image; the body depends on the Accept header."""
+    return Response(content=content, media_type=DISPLAY_FORMATS[image_format][2],
+                    headers=_display_headers(etag))
+
+
+async def _read_optional_upload(request: Request, upload: Optional[UploadFile]
+                                ) -> Optional[Union[bytes, memoryview]]:
+    """Read an upload that may not have been sent."""
+    return await _read_upload(request, upload) if upload else None
+
+
+async def _prepare_iris(request: Request, image_data: Optional[bytes], eye_side: str
+                        ) -> Tuple[Optional[bytes], Optional[Dict]]:
+    """
+    Run the image pipeline on an optional iris image.
+
+    Returns (preprocessed JPEG for the agents, features), or (None, None)
+    when the eye wasn't uploaded.
+    """
+    if image_data is None:
+        return None, None
+
+    prepared = await _run_cached(request, (_image_key(image_data), "analysis", eye_side),
+                                 "prepare_for_analysis", image_data, eye_side)
+    if prepared is None:
+        raise HTTPException(status_code=400, detail="Could not decode image")
+    return prepared
+
+
+@asynccontextmanager
+async def _analysis_lock(cache_key: str) -> AsyncIterator[None]:
+    """
+    Hold the lock for one analysis cache key, so concurrent identical
+    requests wait on the first one instead of duplicating the LLM calls.
+    """
+    lock = _analysis_locks.setdefault(cache_key, asyncio.Lock())
+    _analysis_lock_users[cache_key] = _analysis_lock_users.get(cache_key, 0) + 1
+    try:
+        async with lock:
+            yield
+    finally:
+        # lock.locked() can't tell whether others are still queued on it
+        users = _analysis_lock_users[cache_key] - 1
+        if users:
+            _analysis_lock_users[cache_key] = users
+        else:
+            del _analysis_lock_users[cache_key]
+            del _analysis_locks[cache_key]
+
+
+async def _analyze_case(request: Request, patient_name: str, notes: Optional[str],
+                        left_data_raw: Optional[bytes], right_data_raw: Optional[bytes]) -> Dict:
+    """Run the image pipeline and all three doctors for one patient."""
+    # Left and right eyes run through the image pipeline concurrently
+    (left_data, left_features), (right_data, right_features) = await asyncio.gather(
+        _prepare_iris(request, left_data_raw, "left"),
+        _prepare_iris(request, right_data_raw, "right")
+    )
+
+    cache_key = _analysis_cache_key(left_data_raw, right_data_raw, patient_name, notes, ALL_DOCTORS)
+
+    async with _analysis_lock(cache_key):
+        analysis_results = _analysis_cache.get(cache_key)
+        if analysis_results is not None:
+            logger.info("Analysis cache hit for %s, skipped %d LLM calls",
+                        patient_name, len(ALL_DOCTORS))
+        else:
+            # Run analysis with all three agents (using preprocessed images for vision analysis)
+            analysis_results = await get_agent_manager().analyze_all(
+                left_iris_features=left_features,
+                right_iris_features=right_features,
+                patient_name=patient_name,
+                notes=notes,
+                left_iris_image=left_data,
+                right_iris_image=right_data
+            )
+            # A doctor that failed should be retried next time, not cached
+            if not any("error" in analysis for analysis in analysis_results.values()):
+                _analysis_cache[cache_key] = analysis_results
+
+    return {
+        "patient_name": patient_name,
+        "notes": notes,
+        "image_analysis": {
+            "left_iris": left_features,
+            "right_iris": right_features
+        },
+        "doctor_analyses": analysis_results
+    }
+
+
+async def _extract_upload_features(request: Request, upload: Optional[UploadFile],
+                                   eye_side: str) -> Optional[Dict]:
+    """Read an optional iris upload and extract its features."""
+    if not upload:
+        return None
+    image_data = await _read_upload(request, upload)
+    return await _image_features(request, image_data, _image_key(image_data), eye_side)
 
 
 @router.post("/analyze")
 async def analyze_iris(
+    request: Request,
     patient_name: str = Form(...),
     notes: Optional[str] = Form(None),
     left_iris: Optional[UploadFile] = File(None),
@@ -35,48 +363,179 @@ async def analyze_iris(
     if not left_iris and not right_iris:
         raise HTTPException(status_code=400, detail="At least one iris image is required")
 
-    left_features = None
-    right_features = None
-    left_data = None
-    right_data = None
-
-    # Process left iris if provided
-    if left_iris:
-        left_data_raw = await left_iris.read()
-        # Preprocess: remove glare and enhance for better analysis
-        left_data = image_processor.preprocess_image_bytes(left_data_raw)
-        left_features = await image_processor.process_image(left_data_raw, "left")
-
-    # Process right iris if provided
-    if right_iris:
-        right_data_raw = await right_iris.read()
-        # Preprocess: remove glare and enhance for better analysis
-        right_data = image_processor.preprocess_image_bytes(right_data_raw)
-        right_features = await image_processor.process_image(right_data_raw, "right")
-
-    # Run analysis with all three agents (using preprocessed images for vision analysis)
-    analysis_results = await agent_manager.analyze_all(
-        left_iris_features=left_features,
-        right_iris_features=right_features,
-        patient_name=patient_name,
-        notes=notes,
-        left_iris_image=left_data,
-        right_iris_image=right_data
+    left_data_raw, right_data_raw = await asyncio.gather(
+        _read_optional_upload(request, left_iris), _read_optional_upload(request, right_iris)
+    )
+    return ORJSONResponse(
+        await _analyze_case(request, patient_name, notes, left_data_raw, right_data_raw)
     )
 
-    return {
-        "patient_name": patient_name,
-        "notes": notes,
-        "image_analysis": {
-            "left_iris": left_features,
-            "right_iris": right_features
-        },
-        "doctor_analyses": analysis_results
-    }
+
+@router.post("/analyze-batch")
+async def analyze_iris_batch(
+    request: Request,
+    manifest: str = Form(...),
+    files: List[UploadFile] = File(...)
+):
+    """
+    Analyze several patients in one request using all three doctor methodologies.
+
+    - manifest: JSON list of cases, each with patient_name, optional notes, and
+      the filenames of its left_iris and/or right_iris among the uploaded files
+    - files: the iris images referenced by the manifest
+    - Returns one result per case, in manifest order; a case that fails
+      carries an "error" message instead of analyses
+    """
+    try:
+        cases = _batch_manifest_adapter.validate_json(manifest)
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid manifest: {e}")
+
+    if not cases:
+        raise HTTPException(status_code=400, detail="Manifest has no cases")
+    if len(cases) > MAX_BATCH_CASES:
+        raise HTTPException(status_code=400, detail=f"A batch can have at most {MAX_BATCH_CASES} cases")
+
+    uploads = {upload.filename: upload for upload in files}
+    if len(uploads) != len(files):
+        raise HTTPException(status_code=400, detail="Uploaded filenames must be unique")
+
+    for case in cases:
+        if not case.left_iris and not case.right_iris:
+            raise HTTPException(status_code=400,
+                                detail=f"Case '{case.patient_name}' needs at least one iris image")
+        for filename in (case.left_iris, case.right_iris):
+            if filename and filename not in uploads:
+                raise HTTPException(status_code=400, detail=f"File '{filename}' was not uploaded")
+
+    # The form parser has already spooled the files, so their sizes are known
+    # before any of them is read
+    if any((upload.size or 0) > MAX_UPLOAD_BYTES for upload in files):
+        raise HTTPException(status_code=413, detail="Image upload is too large")
+    if sum(upload.size or 0 for upload in files) > MAX_BATCH_BYTES:
+        raise HTTPException(status_code=413, detail="Batch uploads are too large")
+
+    # Each image is read when the first case using it gets a slot, so only
+    # the cases being analyzed hold their images; a shared file is read once
+    reads: Dict[str, asyncio.Task] = {}
+
+    async def read_image(filename: Optional[str]) -> Optional[Union[bytes, memoryview]]:
+        if not filename:
+            return None
+        if filename not in reads:
+            reads[filename] = asyncio.ensure_future(_read_upload(request, uploads[filename]))
+        return await reads[filename]
+
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def analyze_one(case: BatchAnalysisCase) -> Dict:
+        async with semaphore:
+            try:
+                left_data, right_data = await asyncio.gather(
+                    read_image(case.left_iris), read_image(case.right_iris)
+                )
+                return await _analyze_case(request, case.patient_name, case.notes, left_data, right_data)
+            except HTTPException as e:
+                return {"patient_name": case.patient_name, "notes": case.notes, "error": e.detail}
+            except Exception:
+                logger.exception("Batch analysis failed for %s", case.patient_name)
+                return {"patient_name": case.patient_name, "notes": case.notes, "error": "Analysis failed"}
+
+    results = await asyncio.gather(*[analyze_one(case) for case in cases])
+    return ORJSONResponse({"results": results})
+
+
+@router.post("/analyze/stream")
+async def analyze_iris_stream(
+    request: Request,
+    patient_name: str = Form(...),
+    notes: Optional[str] = Form(None),
+    left_iris: Optional[UploadFile] = File(None),
+    right_iris: Optional[UploadFile] = File(None)
+):
+    """
+    Analyze iris images with all three doctors, streaming results as Server-Sent Events.
+
+    Takes the same form fields as /analyze. Emits an "image_analysis" event
+    with the extracted features, then a "doctor" event ({"doctor", "analysis"})
+    as each doctor finishes, and finally "done". A doctor that fails emits an
+    "error" event ({"doctor", "error"}) instead.
+    """
+    if not left_iris and not right_iris:
+        raise HTTPException(status_code=400, detail="At least one iris image is required")
+
+    left_data_raw, right_data_raw = await asyncio.gather(
+        _read_optional_upload(request, left_iris), _read_optional_upload(request, right_iris)
+    )
+    # Image errors surface as a normal 400 before the stream starts
+    (left_data, left_features), (right_data, right_features) = await asyncio.gather(
+        _prepare_iris(request, left_data_raw, "left"),
+        _prepare_iris(request, right_data_raw, "right")
+    )
+    cache_key = _analysis_cache_key(left_data_raw, right_data_raw, patient_name, notes, ALL_DOCTORS)
+
+    async def run_doctor(doctor: str, encoded: Dict[str, Optional[str]]) -> Tuple[str, Optional[Dict]]:
+        try:
+            analysis = await get_agent_manager().analyze_single(
+                doctor, left_features, right_features,
+                patient_name, notes, left_data, right_data, encoded
+            )
+        except Exception:
+            logger.exception("Streaming analysis failed for %s (%s)", patient_name, doctor)
+            return doctor, None
+        return doctor, analysis
+
+    async def events() -> AsyncIterator[bytes]:
+        yield _sse_event("image_analysis", {
+            "patient_name": patient_name,
+            "notes": notes,
+            "image_analysis": {
+                "left_iris": left_features,
+                "right_iris": right_features
+            }
+        })
+
+        # Same lock as /analyze: an identical request already running (on
+        # either endpoint) is waited for and its results streamed from the cache
+        async with _analysis_lock(cache_key):
+            cached = _analysis_cache.get(cache_key)
+            if cached is not None:
+                logger.info("Analysis cache hit for %s, skipped %d LLM calls",
+                            patient_name, len(ALL_DOCTORS))
+                for doctor, analysis in cached.items():
+                    yield _sse_event("doctor", {"doctor": doctor, "analysis": analysis})
+            else:
+                # Serialized and encoded once for all three doctors
+                encoded = get_agent_manager().encode_case(left_features, right_features,
+                                                          left_data, right_data)
+                results = {}
+                tasks = [asyncio.ensure_future(run_doctor(doctor, encoded)) for doctor in ALL_DOCTORS]
+                try:
+                    # Each doctor is sent as soon as it finishes, whatever the order
+                    for future in asyncio.as_completed(tasks):
+                        doctor, analysis = await future
+                        if analysis is None:
+                            yield _sse_event("error", {"doctor": doctor, "error": "Analysis failed"})
+                            continue
+                        results[doctor] = analysis
+                        yield _sse_event("doctor", {"doctor": doctor, "analysis": analysis})
+                finally:
+                    # Client went away mid-stream
+                    for task in tasks:
+                        task.cancel()
+
+                if len(results) == len(ALL_DOCTORS):
+                    _analysis_cache[cache_key] = {doctor: results[doctor] for doctor in ALL_DOCTORS}
+
+        yield _sse_event("done", {})
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 
 @router.post("/analyze/{doctor}")
 async def analyze_iris_single_doctor(
+    request: Request,
     doctor: str,
     patient_name: str = Form(...),
     notes: Optional[str] = Form(None),
@@ -96,19 +555,13 @@ async def analyze_iris_single_doctor(
     if doctor.lower() not in ["peczely", "jensen", "morse"]:
         raise HTTPException(status_code=400, detail="Doctor must be 'peczely', 'jensen', or 'morse'")
 
-    left_features = None
-    right_features = None
-
-    if left_iris:
-        left_data = await left_iris.read()
-        left_features = await image_processor.process_image(left_data, "left")
-
-    if right_iris:
-        right_data = await right_iris.read()
-        right_features = await image_processor.process_image(right_data, "right")
+    left_features, right_features = await asyncio.gather(
+        _extract_upload_features(request, left_iris, "left"),
+        _extract_upload_features(request, right_iris, "right")
+    )
 
     # Run analysis with specified doctor agent
-    analysis_result = agent_manager.analyze_single(
+    analysis_result = await get_agent_manager().analyze_single(
         doctor=doctor,
         left_iris_features=left_features,
         right_iris_features=right_features,
@@ -116,7 +569,7 @@ async def analyze_iris_single_doctor(
         notes=notes
     )
 
-    return {
+    return ORJSONResponse({
         "patient_name": patient_name,
         "notes": notes,
         "image_analysis": {
@@ -124,11 +577,12 @@ async def analyze_iris_single_doctor(
             "right_iris": right_features
         },
         "doctor_analysis": analysis_result
-    }
+    })
 
 
 @router.post("/process-image")
 async def process_image_only(
+    request: Request,
     eye_side: str = Form(...),
     iris_image: UploadFile = File(...)
 ):
@@ -141,51 +595,77 @@ async def process_image_only(
     if eye_side not in ["left", "right"]:
         raise HTTPException(status_code=400, detail="eye_side must be 'left' or 'right'")
 
-    image_data = await iris_image.read()
-    features = await image_processor.process_image(image_data, eye_side)
+    image_data = await _read_upload(request, iris_image)
+    features = await _image_features(request, image_data, _image_key(image_data), eye_side)
 
-    return {
+    return ORJSONResponse({
         "eye_side": eye_side,
         "features": features
-    }
+    })
 
 
 @router.post("/annotate-image")
 async def get_annotated_image(
+    request: Request,
     eye_side: str = Form(...),
     iris_image: UploadFile = File(...)
 ):
     """
     Get an annotated version of the iris image with zones marked.
+
+    Returned as WebP if the Accept header allows it, otherwise JPEG. Sends an
+    ETag and answers a matching If-None-Match with 304.
     """
     if eye_side not in ["left", "right"]:
         raise HTTPException(status_code=400, detail="eye_side must be 'left' or 'right'")
 
-    image_data = await iris_image.read()
-    features = await image_processor.process_image(image_data, eye_side)
-    annotated = image_processor.create_annotated_image(image_data, features)
+    image_format = _display_format(request)
+    image_data = await _read_upload(request, iris_image)
+    image_key = _image_key(image_data)
+    cache_key = (image_key, "annotated", eye_side, image_format)
+
+    etag = _display_etag(*cache_key)
+    if _etag_matches(request, etag):
+        return _not_modified(etag)
 
-    from fastapi.responses import Response
-    return Response(content=annotated, media_type="image/png")
+    annotated = _image_cache.get(cache_key)
+    if annotated is None:
+        features = await _image_features(request, image_data, image_key, eye_side)
+        annotated = await _run_cached(request, cache_key, "create_annotated_image",
+                                      image_data, features, image_format)
+
+    return _display_response(annotated, image_format, etag)
 
 
 @router.post("/crop-iris")
 async def get_cropped_iris(
+    request: Request,
     iris_image: UploadFile = File(...)
 ):
     """
     Detect and crop just the circular iris from the image.
     Returns a PNG with transparent background showing only the iris.
+
+    Crops are cached by the upload's content hash, so sending the same image
+    again skips the glare removal, enhancement and detection. Sends an ETag
+    and answers a matching If-None-Match with 304.
     """
-    image_data = await iris_image.read()
-    cropped = image_processor.crop_iris_circle(image_data)
+    image_data = await _read_upload(request, iris_image)
+    cache_key = (_image_key(image_data), "crop")
+
+    etag = _display_etag(*cache_key)
+    if _etag_matches(request, etag):
+        return _not_modified(etag)
+
+    cropped = await _run_cached(request, cache_key, "crop_iris_circle", image_data)
 
-    from fastapi.responses import Response
-    return Response(content=cropped, media_type="image/png")
+    # Stays PNG: the transparent background needs an alpha channel
+    return _display_response(cropped, "png", etag)
 
 
 @router.post("/preprocess-image")
 async def get_preprocessed_image(
+    request: Request,
     eye_side: str = Form(...),
     iris_image: UploadFile = File(...),
     remove_glare: bool = Form(True),
@@ -196,25 +676,25 @@ async def get_preprocessed_image(
 
     - remove_glare: Remove light reflections using inpainting (default: True)
     - enhance: Apply contrast enhancement (default: True)
+
+    Returned as WebP if the Accept header allows it, otherwise JPEG. Sends an
+    ETag and answers a matching If-None-Match with 304.
     """
     if eye_side not in ["left", "right"]:
         raise HTTPException(status_code=400, detail="eye_side must be 'left' or 'right'")
 
-    import cv2
-    import numpy as np
-
-    image_data = await iris_image.read()
-    nparr = np.frombuffer(image_data, np.uint8)
-    image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    image_format = _display_format(request)
+    image_data = await _read_upload(request, iris_image)
+    cache_key = (_image_key(image_data), "preprocessed", remove_glare, enhance, image_format)
 
-    if image is None:
-        raise HTTPException(status_code=400, detail="Could not decode image")
+    etag = _display_etag(*cache_key)
+    if _etag_matches(request, etag):
+        return _not_modified(etag)
 
-    # Apply preprocessing
-    processed = image_processor.preprocess_iris_image(image, remove_glare, enhance)
+    processed = await _run_cached(request, cache_key, "render_preprocessed",
+                                  image_data, remove_glare, enhance, image_format)
 
-    # Encode back to bytes
-    _, buffer = cv2.imencode('.png', processed)
+    if processed is None:
+        raise HTTPException(status_code=400, detail="Could not decode image")
 
-    from fastapi.responses import Response
-    return Response(content=buffer.tobytes(), media_type="image/png")
+    return _display_response(processed, image_format, etag)
@@ -4,126 +4,134 @@ Patients Router
 Handles patient record management.
 """
 
-from fastapi import APIRouter, HTTPException
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Response
+from pydantic import TypeAdapter
+from typing import Dict, List, Optional
 from datetime import datetime
-import json
-from pathlib import Path
 
+from ..db import get_db
 from ..models.schemas import PatientCreate, Patient
 
 router = APIRouter(prefix="/api/patients", tags=["patients"])
 
-# Simple file-based storage for patients
-PATIENTS_FILE = Path(__file__).parent.parent.parent / "data" / "patients.json"
+# In-memory copy of the patients table, keyed by id in id order. It's
+# reloaded when SQLite's data_version shows another connection (e.g. a
+# second worker) has committed, and updated in place on our own writes,
+# which don't change data_version.
+_cache: Optional[Dict[int, Patient]] = None
+_cache_version: Optional[int] = None
 
+# Built once; list_patients serializes through it directly
+_patient_list_adapter = TypeAdapter(List[Patient])
 
-def _ensure_data_dir():
-    """Ensure the data directory exists."""
-    PATIENTS_FILE.parent.mkdir(parents=True, exist_ok=True)
-    if not PATIENTS_FILE.exists():
-        with open(PATIENTS_FILE, "w") as f:
-            json.dump({"patients": [], "next_id": 1}, f)
 
+def _row_to_patient(row) -> Patient:
+    """Convert a patients table row to a Patient."""
+    return Patient(
+        id=row["id"],
+        name=row["name"],
+        notes=row["notes"],
+        created_at=datetime.fromisoformat(row["created_at"])
+    )
+
+
+async def _load_patients() -> Dict[int, Patient]:
+    """Return all patients, reading the table only if it changed elsewhere."""
+    global _cache, _cache_version
+    db = get_db()
+
+    async with db.execute("PRAGMA data_version") as cursor:
+        (version,) = await cursor.fetchone()
+    if _cache is not None and version == _cache_version:
+        return _cache
 
-def _load_patients() -> dict:
-    """Load patients from file."""
-    _ensure_data_dir()
-    with open(PATIENTS_FILE, "r") as f:
-        return json.load(f)
+    async with db.execute(
+        "SELECT id, name, notes, created_at FROM patients ORDER BY id"
+    ) as cursor:
+        rows = await cursor.fetchall()
+    _cache = {row["id"]: _row_to_patient(row) for row in rows}
+    _cache_version = version
+    return _cache
 
 
-def _save_patients(data: dict):
-    """Save patients to file."""
-    _ensure_data_dir()
-    with open(PATIENTS_FILE, "w") as f:
-        json.dump(data, f, indent=2, default=str)
+def _forget_cache() -> None:
+    """Force the next read to reload the table."""
+    global _cache
+    _cache = None
 
 
 @router.get("/", response_model=List[Patient])
 async def list_patients():
     """Get all patients."""
-    data = _load_patients()
-    return [
-        Patient(
-            id=p["id"],
-            name=p["name"],
-            notes=p.get("notes"),
-            created_at=datetime.fromisoformat(p["created_at"])
-        )
-        for p in data["patients"]
-    ]
+    patients = list((await _load_patients()).values())
+    return Response(content=_patient_list_adapter.dump_json(patients), media_type="application/json")
 
 
 @router.get("/{patient_id}", response_model=Patient)
 async def get_patient(patient_id: int):
     """Get a specific patient by ID."""
-    data = _load_patients()
-    for p in data["patients"]:
-        if p["id"] == patient_id:
-            return Patient(
-                id=p["id"],
-                name=p["name"],
-                notes=p.get("notes"),
-                created_at=datetime.fromisoformat(p["created_at"])
-            )
-    raise HTTPException(status_code=404, detail="Patient not found")
+    patient = (await _load_patients()).get(patient_id)
+    if patient is None:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    return patient
 
 
 @router.post("/", response_model=Patient)
 async def create_patient(patient: PatientCreate):
     """Create a new patient."""
-    data = _load_patients()
+    db = get_db()
+    created_at = datetime.now()
 
-    new_patient = {
-        "id": data["next_id"],
-        "name": patient.name,
-        "notes": patient.notes,
-        "created_at": datetime.now().isoformat()
-    }
-
-    data["patients"].append(new_patient)
-    data["next_id"] += 1
-    _save_patients(data)
+    cursor = await db.execute(
+        "INSERT INTO patients (name, notes, created_at) VALUES (?, ?, ?)",
+        (patient.name, patient.notes, created_at.isoformat())
+    )
+    await db.commit()
 
-    return Patient(
-        id=new_patient["id"],
-        name=new_patient["name"],
-        notes=new_patient["notes"],
-        created_at=datetime.fromisoformat(new_patient["created_at"])
+    new_patient = Patient(
+        id=cursor.lastrowid,
+        name=patient.name,
+        notes=patient.notes,
+        created_at=created_at
     )
+    if _cache is not None:
+        _cache[new_patient.id] = new_patient
+    return new_patient
 
 
 @router.put("/{patient_id}", response_model=Patient)
 async def update_patient(patient_id: int, patient: PatientCreate):
     """Update an existing patient."""
-    data = _load_patients()
+    db = get_db()
 
-    for i, p in enumerate(data["patients"]):
-        if p["id"] == patient_id:
-            data["patients"][i]["name"] = patient.name
-            data["patients"][i]["notes"] = patient.notes
-            _save_patients(data)
+    cursor = await db.execute(
+        "UPDATE patients SET name = ?, notes = ? WHERE id = ?",
+        (patient.name, patient.notes, patient_id)
+    )
+    await db.commit()
+    if cursor.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Patient not found")
 
-            return Patient(
-                id=p["id"],
-                name=patient.name,
-                notes=patient.notes,
-                created_at=datetime.fromisoformat(p["created_at"])
-            )
+    cached = _cache.get(patient_id) if _cache is not None else None
+    if cached is None:
+        _forget_cache()
+        return await get_patient(patient_id)
 
-    raise HTTPException(status_code=404, detail="Patient not found")
+    updated = cached.model_copy(update={"name": patient.name, "notes": patient.notes})
+    _cache[patient_id] = updated
+    return updated
 
 
 @router.delete("/{patient_id}")
 async def delete_patient(patient_id: int):
     """Delete a patient."""
-    data = _load_patients()
+    db = get_db()
 
-    for i, p in enumerate(data["patients"]):
-        if p["id"] == patient_id:
-            del data["patients"][i]
-            _save_patients(data)
-            return {"message": "Patient deleted successfully"}
+    cursor = await db.execute("DELETE FROM patients WHERE id = ?", (patient_id,))
+    await db.commit()
+    if cursor.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    if _cache is not None:
+        _cache.pop(patient_id, None)
 
-    raise HTTPException(status_code=404, detail="Patient not found")
+    return {"message": "Patient deleted successfully"}
@@ -0,0 +1,28 @@
+"""
+Content Hashing
+
+Fast hashing of uploaded bytes for cache keys. xxh3 isn't cryptographic,
+which is fine here: the keys only have to tell different uploads apart.
+"""
+
+from typing import Iterable
+
+import xxhash
+
+
+def content_hash(data: bytes) -> bytes:
+    """Return the 16-byte xxh3-128 digest of data."""
+    return xxhash.xxh3_128_digest(data)
+
+
+def hash_parts(parts: Iterable[bytes]) -> str:
+    """
+    Hash a sequence of byte strings into one hex digest.
+
+    Each part is length-prefixed so field boundaries can't be confused.
+    """
+    digest = xxhash.xxh3_128()
+    for part in parts:
+        digest.update(len(part).to_bytes(8, "little"))
+        digest.update(part)
+    return digest.hexdigest()
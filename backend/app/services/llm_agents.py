@@ -8,95 +8,276 @@ Three specialized agents based on the methodologies of:
 """
 
 import os
+import re
 import json
-import base64
+import asyncio
+import pickle
+import logging
+import binascii
 from pathlib import Path
-from typing import Dict, List, Optional
-from anthropic import Anthropic
+from types import MappingProxyType
+from functools import cache
+from typing import Dict, List, Mapping, Optional
+import orjson
+from anthropic import AsyncAnthropic
 
+logger = logging.getLogger(__name__)
 
-def load_reference_charts() -> Dict[str, str]:
-    """Load reference chart images as base64 for Claude vision."""
-    charts_dir = Path(__file__).parent.parent / "knowledge" / "reference_charts"
-    charts = {}
 
-    if charts_dir.exists():
-        for img_path in charts_dir.glob("*.jpg"):
-            with open(img_path, "rb") as f:
-                img_data = base64.standard_b64encode(f.read()).decode("utf-8")
-                charts[img_path.stem] = img_data
+KNOWLEDGE_DIR = Path(__file__).parent.parent / "knowledge"
 
+
+# Knowledge files never change while the server runs, so each is read once
+# per process however many agents get created
+@cache
+def _read_text(path: Path) -> str:
+    """Read a knowledge text file (methodologies)."""
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+@cache
+def _read_json(path: Path) -> Dict:
+    """Read a knowledge JSON file (Jensen's iris chart). Shared, so don't mutate it."""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# A multiple of 3, so each chunk encodes to base64 without padding
+_BASE64_CHUNK_SIZE = 3 * 16 * 1024
+
+
+# Encoded reference charts, kept with the app's other runtime data rather
+# than in the package
+CHART_CACHE_PATH = Path(__file__).parent.parent.parent / "data" / "cache" / "reference_charts.pkl"
+
+
+def _read_base64(path: Path) -> str:
+    """Base64-encode a file in chunks, without holding the raw bytes in memory."""
+    encoded = bytearray(4 * ((path.stat().st_size + 2) // 3))
+    pos = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(_BASE64_CHUNK_SIZE):
+            block = binascii.b2a_base64(chunk, newline=False)
+            encoded[pos:pos + len(block)] = block
+            pos += len(block)
+    del encoded[pos:]  # In case the file shrank while we read it
+    return encoded.decode("ascii")
+
+
+def _load_chart_cache(cache_path: Path, signature: List) -> Optional[Dict]:
+    """Return the pickled charts if they were built from the current files."""
+    try:
+        with open(cache_path, "rb") as f:
+            cached_signature, charts = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        # Corrupt, truncated or from an incompatible version: just rebuild it
+        logger.warning("Ignoring unreadable reference chart cache: %s", e)
+        return None
+    if cached_signature != signature or not isinstance(charts, dict):
+        return None
     return charts
 
 
-# Load reference charts once at module level
-REFERENCE_CHARTS = load_reference_charts()
+def _save_chart_cache(cache_path: Path, signature: List, charts: Dict) -> None:
+    """Pickle the encoded charts for the next process; best effort."""
+    tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            pickle.dump((signature, charts), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)  # Other workers never see half a file
+    except OSError as e:
+        logger.warning("Could not write reference chart cache: %s", e)
+        tmp_path.unlink(missing_ok=True)
+
+
+def load_reference_charts() -> Mapping[str, Dict]:
+    """
+    Load reference chart images as ready-made Claude vision content blocks.
+
+    The encoded blocks are pickled to CHART_CACHE_PATH, so later processes
+    (every uvicorn worker, every restart) load them instead of re-encoding;
+    the pickle is rebuilt when any chart's name, size or mtime changes.
+    The blocks are shared by every request, so the mapping is read-only.
+    """
+    charts_dir = KNOWLEDGE_DIR / "reference_charts"
+    if not charts_dir.exists():
+        return MappingProxyType({})
+
+    # Sorted so the default chart choice (and the cached prompt prefix) is stable
+    img_paths = sorted(charts_dir.glob("*.jpg"))
+    signature = [(path.name, stat.st_mtime_ns, stat.st_size)
+                 for path, stat in ((path, path.stat()) for path in img_paths)]
+    charts = _load_chart_cache(CHART_CACHE_PATH, signature)
+    if charts is None:
+        charts = {
+            img_path.stem: {
+                "type": "image",
+                "source": {
+                    "type": "base64",
+                    "media_type": "image/jpeg",
+                    "data": _read_base64(img_path)
+                }
+            }
+            for img_path in img_paths
+        }
+        _save_chart_cache(CHART_CACHE_PATH, signature, charts)
+
+    return MappingProxyType(charts)
+
+
+@cache
+def get_reference_charts() -> Mapping[str, Dict]:
+    """
+    Load the reference charts once per process, when the first agent is
+    created. Not at import: the OpenCV pool's worker processes import this
+    module too but never need them.
+    """
+    return load_reference_charts()
+
+
+# Caps in-flight API calls per process so bursts of users don't run into
+# rate limits (429s are retried with backoff by the Anthropic client)
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "10"))
+_llm_slots = asyncio.Semaphore(LLM_CONCURRENCY)
+
+# Bounds how long one stuck call can hold up a request: seconds per attempt,
+# and retries (with exponential backoff) on connection errors, 429s and 5xx
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_MAX_RETRIES = 2
+
+
+# Finds where a ```json block's object starts; the decoder finds its end
+_JSON_BLOCK = re.compile(r"```json\s*(?=\{)")
+_DECODER = json.JSONDecoder()
+
+
+def _dumps(obj, pretty: bool = False, sort_keys: bool = False) -> str:
+    """Serialize to a JSON string with orjson (compact unless pretty)."""
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    if pretty:
+        option |= orjson.OPT_INDENT_2
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    return orjson.dumps(obj, option=option).decode()
+
+
+def _features_json(features: Optional[Dict]) -> Optional[str]:
+    """
+    Serialize iris features for the prompt: compact (indentation only costs
+    input tokens) and sorted, so equal features give equal text.
+    """
+    return _dumps(features, sort_keys=True) if features else None
+
+
+def _image_b64(image: Optional[bytes]) -> Optional[str]:
+    """Base64-encode a patient iris image for a vision content block."""
+    # Base64 is pure ASCII, so the ASCII decoder suffices (and is faster than UTF-8)
+    return binascii.b2a_base64(image, newline=False).decode("ascii") if image else None
+
+
+def _failed_analysis(doctor: str, error: Exception) -> Dict:
+    """Stand-in results for a doctor whose API call failed."""
+    logger.error("%s analysis failed", doctor, exc_info=error)
+    return {
+        "findings": [],
+        "organ_correlations": {},
+        "recommendations": [],
+        "confidence_notes": "This analysis could not be completed; please try again.",
+        "error": "Analysis failed"
+    }
 
 
 class BaseIridologyAgent:
     """Base class for iridology analysis agents."""
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, client: Optional[AsyncAnthropic] = None):
         self.api_key = api_key or os.getenv("ANTHROPIC_API_KEY")
         if not self.api_key:
             raise ValueError("ANTHROPIC_API_KEY not found in environment")
-        self.client = Anthropic(api_key=self.api_key)
+        self.client = client or AsyncAnthropic(api_key=self.api_key, timeout=LLM_TIMEOUT,
+                                               max_retries=LLM_MAX_RETRIES)
         self.methodology = self._load_methodology()
-        self.reference_charts = REFERENCE_CHARTS
+        self.reference_charts = get_reference_charts()
+        # Both are static per agent, so they're built once rather than per call
+        self._system_prompt = self._build_system_prompt()
+        self._static_prefix_content = self._build_static_prefix_content()
 
     def _load_methodology(self) -> str:
         """Load the methodology file for this agent. Override in subclass."""
         raise NotImplementedError
 
-    def _get_system_prompt(self) -> str:
-        """Get the system prompt for this agent. Override in subclass."""
+    def _build_system_prompt(self) -> str:
+        """Build the system prompt for this agent. Override in subclass."""
         raise NotImplementedError
 
+    def _get_system_prompt(self) -> str:
+        """Get the system prompt for this agent."""
+        return self._system_prompt
+
     def _get_reference_chart_keys(self) -> List[str]:
         """Return which reference charts this agent should use. Override in subclass."""
         return list(self.reference_charts.keys())[:2]  # Default: use first 2 charts
 
-    def analyze(self, left_iris_features: Optional[Dict], right_iris_features: Optional[Dict],
+    async def analyze(self, left_iris_features: Optional[Dict], right_iris_features: Optional[Dict],
                 patient_name: str, notes: Optional[str] = None,
-                left_iris_image: Optional[bytes] = None, right_iris_image: Optional[bytes] = None) -> Dict:
-        """Perform iridology analysis using Claude with vision."""
+                left_iris_image: Optional[bytes] = None, right_iris_image: Optional[bytes] = None,
+                left_features_json: Optional[str] = None, right_features_json: Optional[str] = None,
+                left_iris_b64: Optional[str] = None, right_iris_b64: Optional[str] = None) -> Dict:
+        """
+        Perform iridology analysis using Claude with vision.
+
+        Callers running several agents on the same case can pass the features
+        already serialized (see _features_json) and the images already
+        base64-encoded (see _image_b64) so that's only done once.
+        """
+        if left_features_json is None:
+            left_features_json = _features_json(left_iris_features)
+        if right_features_json is None:
+            right_features_json = _features_json(right_iris_features)
+        if left_iris_b64 is None:
+            left_iris_b64 = _image_b64(left_iris_image)
+        if right_iris_b64 is None:
+            right_iris_b64 = _image_b64(right_iris_image)
 
         # Build multi-modal content with images
         content = self._build_analysis_content(
-            left_iris_features, right_iris_features, patient_name, notes,
-            left_iris_image, right_iris_image
+            left_features_json, right_features_json, patient_name, notes,
+            left_iris_b64, right_iris_b64
         )
 
-        response = self.client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=3000,
-            system=self._get_system_prompt(),
-            messages=[
-                {"role": "user", "content": content}
-            ]
-        )
+        async with _llm_slots:
+            response = await self.client.messages.create(
+                model="claude-sonnet-4-20250514",
+                max_tokens=3000,
+                # The system prompt is the doctor's static methodology (no patient
+                # data), so it's identical across calls and served from the prompt cache
+                system=[
+                    {
+                        "type": "text",
+                        "text": self._get_system_prompt(),
+                        "cache_control": {"type": "ephemeral"}
+                    }
+                ],
+                messages=[
+                    {"role": "user", "content": content}
+                ]
+            )
 
         # Parse the response
         return self._parse_response(response.content[0].text)
 
-    def _build_analysis_content(self, left_features: Optional[Dict], right_features: Optional[Dict],
-                                 patient_name: str, notes: Optional[str],
-                                 left_image: Optional[bytes], right_image: Optional[bytes]) -> List[Dict]:
-        """Build multi-modal content including images and text."""
+    def _build_static_prefix_content(self) -> List[Dict]:
+        """Build the reference chart and instruction blocks that open every analysis request."""
         content = []
 
-        # Add reference charts first
         chart_keys = self._get_reference_chart_keys()
         for key in chart_keys:
             if key in self.reference_charts:
-                content.append({
-                    "type": "image",
-                    "source": {
-                        "type": "base64",
-                        "media_type": "image/jpeg",
-                        "data": self.reference_charts[key]
-                    }
-                })
+                content.append(self.reference_charts[key])
 
         if chart_keys:
             content.append({
@@ -115,14 +296,54 @@ CRITICAL OVERLAY INSTRUCTIONS:
 Use the reference charts as a transparent overlay guide - every finding should reference the specific clock position and the corresponding organ zone from the chart."""
             })
 
+        # The analysis instructions hold no patient data either, so they sit
+        # in the cached prefix instead of after the patient images
+        content.append({
+            "type": "text",
+            "text": """ANALYSIS INSTRUCTIONS:
+Using the reference chart as an overlay on the patient's iris images, perform a systematic zone-by-zone analysis:
+
+1. For each clock position (12 o'clock through 11 o'clock), identify:
+   - The organ/system zone from the reference chart at that position
+   - What you observe in the patient's iris at that exact location
+   - Any significant markings (lacunae, crypts, pigmentation, radii solaris, nerve rings, etc.)
+
+2. Examine the concentric rings from center outward:
+   - Pupillary zone (stomach/digestive)
+   - Collarette/Autonomic Nerve Wreath
+   - Ciliary zone (major organs)
+   - Lymphatic/peripheral zone
+
+Based on your methodology and the chart-overlay analysis, please provide:
+1. Key findings (list observations with specific clock positions and corresponding organ zones from the chart)
+2. Organ correlations (map each finding to the organ zone identified on the reference chart)
+3. Recommendations (lifestyle, nutritional, or other suggestions based on findings)
+4. Confidence notes (any limitations or caveats in your analysis)
+
+Format your response as JSON with these keys: findings, organ_correlations, recommendations, confidence_notes"""
+        })
+
+        # Everything up to here is static per agent, so let the prompt cache
+        # cover it; patient images and data always follow this breakpoint
+        content[-1] = {**content[-1], "cache_control": {"type": "ephemeral"}}
+
+        return content
+
+    def _build_analysis_content(self, left_features_json: Optional[str], right_features_json: Optional[str],
+                                 patient_name: str, notes: Optional[str],
+                                 left_image_b64: Optional[str], right_image_b64: Optional[str]) -> List[Dict]:
+        """Build multi-modal content including images and text."""
+        # Reference charts and analysis instructions are the same on every call
+        content = list(self._static_prefix_content)
+
         # Add patient iris images if provided
-        if right_image:
+        if right_image_b64:
             content.append({
                 "type": "image",
                 "source": {
                     "type": "base64",
                     "media_type": "image/jpeg",
-                    "data": base64.standard_b64encode(right_image).decode("utf-8")
+                    "data": right_image_b64
                 }
             })
             content.append({"type": "text", "text": """RIGHT IRIS (OD) - Patient's right eye image above.
@@ -133,13 +354,13 @@ Overlay the RIGHT EYE reference chart onto this iris:
 - At each position, identify the organ zone from the chart and note what you observe in the patient's iris
 - Pay special attention to: lacunae, crypts, pigmentation, fiber density, nerve rings, and coloration changes"""})
 
-        if left_image:
+        if left_image_b64:
             content.append({
                 "type": "image",
                 "source": {
                     "type": "base64",
                     "media_type": "image/jpeg",
-                    "data": base64.standard_b64encode(left_image).decode("utf-8")
+                    "data": left_image_b64
                 }
             })
             content.append({"type": "text", "text": """LEFT IRIS (OS) - Patient's left eye image above.
@@ -150,75 +371,45 @@ Overlay the LEFT EYE reference chart onto this iris:
 - At each position, identify the organ zone from the chart and note what you observe in the patient's iris
 - Pay special attention to: lacunae, crypts, pigmentation, fiber density, nerve rings, and coloration changes"""})
 
-        # Add the text analysis request
+        # Patient-specific data goes last
         content.append({
             "type": "text",
-            "text": self._build_analysis_request(left_features, right_features, patient_name, notes)
+            "text": self._build_analysis_request(left_features_json, right_features_json, patient_name, notes)
         })
 
         return content
 
-    def _build_analysis_request(self, left_features: Optional[Dict], right_features: Optional[Dict],
+    def _build_analysis_request(self, left_features_json: Optional[str], right_features_json: Optional[str],
                                  patient_name: str, notes: Optional[str]) -> str:
-        """Build the analysis request message."""
+        """Build the patient-specific analysis request message."""
         request = f"""Please analyze the following iris data for patient: {patient_name}
 
 """
         if notes:
             request += f"Additional notes from practitioner: {notes}\n\n"
 
-        if right_features:
+        if right_features_json:
             request += "RIGHT IRIS FEATURES:\n"
-            request += json.dumps(right_features, indent=2)
+            request += right_features_json
             request += "\n\n"
 
-        if left_features:
+        if left_features_json:
             request += "LEFT IRIS FEATURES:\n"
-            request += json.dumps(left_features, indent=2)
+            request += left_features_json
             request += "\n\n"
 
-        request += """
-ANALYSIS INSTRUCTIONS:
-Using the reference chart as an overlay on the patient's iris images, perform a systematic zone-by-zone analysis:
-
-1. For each clock position (12 o'clock through 11 o'clock), identify:
-   - The organ/system zone from the reference chart at that position
-   - What you observe in the patient's iris at that exact location
-   - Any significant markings (lacunae, crypts, pigmentation, radii solaris, nerve rings, etc.)
-
-2. Examine the concentric rings from center outward:
-   - Pupillary zone (stomach/digestive)
-   - Collarette/Autonomic Nerve Wreath
-   - Ciliary zone (major organs)
-   - Lymphatic/peripheral zone
-
-Based on your methodology and the chart-overlay analysis, please provide:
-1. Key findings (list observations with specific clock positions and corresponding organ zones from the chart)
-2. Organ correlations (map each finding to the organ zone identified on the reference chart)
-3. Recommendations (lifestyle, nutritional, or other suggestions based on findings)
-4. Confidence notes (any limitations or caveats in your analysis)
-
-Format your response as JSON with these keys: findings, organ_correlations, recommendations, confidence_notes
-"""
+        request += "Follow the ANALYSIS INSTRUCTIONS above and respond with JSON as described there.\n"
         return request
 
     def _parse_response(self, response_text: str) -> Dict:
         """Parse the Claude response into structured data."""
-        # Try to extract JSON from the response
+        # Try to extract JSON from the response: a ```json block if there is
+        # one, otherwise the first object in the text
         try:
-            # Look for JSON block in response
-            if "```json" in response_text:
-                json_start = response_text.find("```json") + 7
-                json_end = response_text.find("```", json_start)
-                json_str = response_text[json_start:json_end].strip()
-            elif "{" in response_text:
-                json_start = response_text.find("{")
-                json_end = response_text.rfind("}") + 1
-                json_str = response_text[json_start:json_end]
-            else:
-                raise ValueError("No JSON found in response")
-
-            parsed = json.loads(json_str)
+            match = _JSON_BLOCK.search(response_text)
+            start = match.end() if match else response_text.index("{")
+            # Decodes in place, without slicing the object out of the text first
+            parsed, _ = _DECODER.raw_decode(response_text, start)
             return {
                 "findings": parsed.get("findings", []),
                 "organ_correlations": parsed.get("organ_correlations", {}),
@@ -239,15 +430,13 @@ class PeczelyAgent(BaseIridologyAgent):
     """Agent based on Ignaz von Peczely's methodology."""
 
     def _load_methodology(self) -> str:
-        path = Path(__file__).parent.parent / "knowledge" / "peczely_methodology.md"
-        with open(path, "r", encoding="utf-8") as f:
-            return f.read()
+        return _read_text(KNOWLEDGE_DIR / "peczely_methodology.md")
 
     def _get_reference_chart_keys(self) -> List[str]:
         # Use the general iridology chart and seven zones chart
         return ["81e5Oz3mPRL._AC_SL1500_", "il_1588xN.6184987103_2pch"]
 
-    def _get_system_prompt(self) -> str:
+    def _build_system_prompt(self) -> str:
         return f"""You are an iridology analysis system based on the methodology of Dr. Ignaz von Peczely (1826-1911), the father of modern iridology.
 
 ## Your Methodology:
@@ -274,32 +463,29 @@ Provide your analysis in a structured, professional manner while honoring Peczel
 class JensenAgent(BaseIridologyAgent):
     """Agent based on Bernard Jensen's methodology."""
 
-    def __init__(self, api_key: Optional[str] = None):
-        super().__init__(api_key)
+    def __init__(self, api_key: Optional[str] = None, client: Optional[AsyncAnthropic] = None):
+        # Loaded first, the system prompt built in the base __init__ includes it
         self.iris_chart = self._load_iris_chart()
+        super().__init__(api_key, client)
 
     def _load_methodology(self) -> str:
-        path = Path(__file__).parent.parent / "knowledge" / "jensen_methodology.md"
-        with open(path, "r", encoding="utf-8") as f:
-            return f.read()
+        return _read_text(KNOWLEDGE_DIR / "jensen_methodology.md")
 
     def _load_iris_chart(self) -> Dict:
-        path = Path(__file__).parent.parent / "knowledge" / "jensen_iris_chart.json"
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return _read_json(KNOWLEDGE_DIR / "jensen_iris_chart.json")
 
     def _get_reference_chart_keys(self) -> List[str]:
         # Use Bernard Jensen's official chart and the detailed iridiagnosis chart
         return ["Screenshot 2026-02-08 124523", "il_1588xN.6136875798_1k0l"]
 
-    def _get_system_prompt(self) -> str:
+    def _build_system_prompt(self) -> str:
         return f"""You are an iridology analysis system based on the methodology of Dr. Bernard Jensen (1908-2001), who dedicated over 75 years to iridology practice and research.
 
 ## Your Methodology:
 {self.methodology}
 
 ## Jensen's 96-Zone Iris Chart Reference:
-{json.dumps(self.iris_chart, indent=2)}
+{_dumps(self.iris_chart, pretty=True)}
 
 ## Your Analysis Approach:
 1. Determine constitutional type (Blue/Lymphatic, Brown/Hematogenic, Mixed/Biliary, or Hazel)
@@ -326,15 +512,13 @@ class MorseAgent(BaseIridologyAgent):
     """Agent based on Dr. Robert Morse's methodology."""
 
     def _load_methodology(self) -> str:
-        path = Path(__file__).parent.parent / "knowledge" / "morse_methodology.md"
-        with open(path, "r", encoding="utf-8") as f:
-            return f.read()
+        return _read_text(KNOWLEDGE_DIR / "morse_methodology.md")
 
     def _get_reference_chart_keys(self) -> List[str]:
         # Use the reflexology cards which show organ zones clearly
         return ["il_1588xN.7613594020_fu4u", "il_1588xN.7661532365_kcyc"]
 
-    def _get_system_prompt(self) -> str:
+    def _build_system_prompt(self) -> str:
         return f"""You are an iridology analysis system based on the methodology of Dr. Robert Morse, ND, a naturopathic doctor with over 50 years of practice specializing in detoxification and cellular regeneration.
 
 ## Your Methodology:
@@ -373,83 +557,146 @@ class IridologyAgentManager:
 
     def __init__(self, api_key: Optional[str] = None):
         self.api_key = api_key
+        self._client: Optional[AsyncAnthropic] = None
         self._peczely_agent = None
         self._jensen_agent = None
         self._morse_agent = None
 
+    @property
+    def client(self) -> AsyncAnthropic:
+        """One client (and connection pool) shared by all three agents."""
+        if self._client is None:
+            api_key = self.api_key or os.getenv("ANTHROPIC_API_KEY")
+            if not api_key:
+                raise ValueError("ANTHROPIC_API_KEY not found in environment")
+            self._client = AsyncAnthropic(api_key=api_key, timeout=LLM_TIMEOUT,
+                                          max_retries=LLM_MAX_RETRIES)
+        return self._client
+
     @property
     def peczely_agent(self) -> PeczelyAgent:
         if self._peczely_agent is None:
-            self._peczely_agent = PeczelyAgent(self.api_key)
+            self._peczely_agent = PeczelyAgent(self.api_key, self.client)
         return self._peczely_agent
 
     @property
     def jensen_agent(self) -> JensenAgent:
         if self._jensen_agent is None:
-            self._jensen_agent = JensenAgent(self.api_key)
+            self._jensen_agent = JensenAgent(self.api_key, self.client)
         return self._jensen_agent
 
     @property
     def morse_agent(self) -> MorseAgent:
         if self._morse_agent is None:
-            self._morse_agent = MorseAgent(self.api_key)
+            self._morse_agent = MorseAgent(self.api_key, self.client)
         return self._morse_agent
 
+    # Doctor (or first name) -> (agent property getter, doctor name, methodology)
+    _DOCTOR_TABLE = {
+        **dict.fromkeys(("peczely", "ignaz"), (
+            peczely_agent.fget, "Ignaz von Peczely", "Historical/Foundational Iridology (1880s)"
+        )),
+        **dict.fromkeys(("jensen", "bernard"), (
+            jensen_agent.fget, "Bernard Jensen", "Comprehensive Constitutional Analysis (75 years of research)"
+        )),
+        **dict.fromkeys(("morse", "robert"), (
+            morse_agent.fget, "Dr. Robert Morse, ND", "Naturopathic/Detoxification Approach (50+ years of practice)"
+        )),
+    }
+
+    @staticmethod
+    def encode_case(left_iris_features: Optional[Dict], right_iris_features: Optional[Dict],
+                    left_iris_image: Optional[bytes] = None,
+                    right_iris_image: Optional[bytes] = None) -> Dict[str, Optional[str]]:
+        """
+        Serialize a case's features and base64-encode its images, for callers
+        that pass the same case to analyze_single for several doctors.
+        """
+        return {
+            "left_features_json": _features_json(left_iris_features),
+            "right_features_json": _features_json(right_iris_features),
+            "left_iris_b64": _image_b64(left_iris_image),
+            "right_iris_b64": _image_b64(right_iris_image),
+        }
+
     async def analyze_all(self, left_iris_features: Optional[Dict],
                           right_iris_features: Optional[Dict],
                           patient_name: str,
                           notes: Optional[str] = None,
                           left_iris_image: Optional[bytes] = None,
                           right_iris_image: Optional[bytes] = None) -> Dict:
-        """Run analysis with all three doctor agents."""
+        """
+        Run analysis with all three doctor agents.
+
+        The three API calls run concurrently on the event loop, so the
+        request takes as long as the slowest doctor. A doctor whose call
+        fails gets empty results with an "error" message instead of failing
+        the others; only if all three fail is the error raised.
+        """
+
+        # Serialized and encoded once here rather than once per agent
+        args = (left_iris_features, right_iris_features, patient_name, notes,
+                left_iris_image, right_iris_image)
+        encoded = self.encode_case(left_iris_features, right_iris_features,
+                                   left_iris_image, right_iris_image)
+        outcomes = await asyncio.gather(
+            self.peczely_agent.analyze(*args, **encoded),
+            self.jensen_agent.analyze(*args, **encoded),
+            self.morse_agent.analyze(*args, **encoded),
+            return_exceptions=True
+        )
+        for outcome in outcomes:
+            if isinstance(outcome, BaseException) and not isinstance(outcome, Exception):
+                raise outcome  # Cancellation and the like aren't analysis failures
+        if all(isinstance(outcome, Exception) for outcome in outcomes):
+            raise outcomes[0]
+        peczely, jensen, morse = (
+            _failed_analysis(doctor, outcome) if isinstance(outcome, Exception) else outcome
+            for doctor, outcome in zip(("peczely", "jensen", "morse"), outcomes)
+        )
 
         results = {
             "peczely": {
                 "doctor_name": "Ignaz von Peczely",
                 "methodology": "Historical/Foundational Iridology (1880s)",
-                **self.peczely_agent.analyze(left_iris_features, right_iris_features, patient_name, notes,
-                                              left_iris_image, right_iris_image)
+                **peczely
             },
             "jensen": {
                 "doctor_name": "Bernard Jensen",
                 "methodology": "Comprehensive Constitutional Analysis (75 years of research)",
-                **self.jensen_agent.analyze(left_iris_features, right_iris_features, patient_name, notes,
-                                             left_iris_image, right_iris_image)
+                **jensen
             },
             "morse": {
                 "doctor_name": "Dr. Robert Morse, ND",
                 "methodology": "Naturopathic/Detoxification Approach (50+ years of practice)",
-                **self.morse_agent.analyze(left_iris_features, right_iris_features, patient_name, notes,
-                                            left_iris_image, right_iris_image)
+                **morse
             }
         }
 
         return results
 
-    def analyze_single(self, doctor: str, left_iris_features: Optional[Dict],
+    async def analyze_single(self, doctor: str, left_iris_features: Optional[Dict],
                        right_iris_features: Optional[Dict],
-                       patient_name: str, notes: Optional[str] = None) -> Dict:
-        """Run analysis with a single doctor agent."""
-
-        doctor_lower = doctor.lower()
-
-        if doctor_lower in ["peczely", "ignaz"]:
-            agent = self.peczely_agent
-            doctor_name = "Ignaz von Peczely"
-            methodology = "Historical/Foundational Iridology (1880s)"
-        elif doctor_lower in ["jensen", "bernard"]:
-            agent = self.jensen_agent
-            doctor_name = "Bernard Jensen"
-            methodology = "Comprehensive Constitutional Analysis (75 years of research)"
-        elif doctor_lower in ["morse", "robert"]:
-            agent = self.morse_agent
-            doctor_name = "Dr. Robert Morse, ND"
-            methodology = "Naturopathic/Detoxification Approach (50+ years of practice)"
-        else:
-            raise ValueError(f"Unknown doctor: {doctor}. Use 'peczely', 'jensen', or 'morse'.")
+                       patient_name: str, notes: Optional[str] = None,
+                       left_iris_image: Optional[bytes] = None,
+                       right_iris_image: Optional[bytes] = None,
+                       encoded: Optional[Dict[str, Optional[str]]] = None) -> Dict:
+        """
+        Run analysis with a single doctor agent.
+
+        encoded is the case as returned by encode_case, so a caller running
+        several doctors serializes and encodes it only once.
+        """
+
+        try:
+            get_agent, doctor_name, methodology = self._DOCTOR_TABLE[doctor.lower()]
+        except KeyError:
+            raise ValueError(f"Unknown doctor: {doctor}. Use 'peczely', 'jensen', or 'morse'.") from None
+        agent = get_agent(self)
 
         return {
             "doctor_name": doctor_name,
             "methodology": methodology,
-            **agent.analyze(left_iris_features, right_iris_features, patient_name, notes)
+            **await agent.analyze(left_iris_features, right_iris_features, patient_name, notes,
+                                  left_iris_image, right_iris_image, **(encoded or {}))
         }
@@ -0,0 +1,78 @@
+"""Shared fixtures: synthetic iris images with a known pupil."""
+
+from typing import Tuple
+
+import cv2
+import numpy as np
+import pytest
+
+
+def make_iris_image(width: int, height: int, pupil_radius: int, seed: int = 0,
+                    textured: bool = False) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """
+    Draw a grayscale eye: light sclera, a darker iris with radial fibres and
+    a near-black pupil of pupil_radius, slightly off the image centre.
+
+    textured adds skin-like shading and eyelashes above and below. Returns the
+    image and the pupil centre.
+    """
+    rng = np.random.default_rng(seed)
+    image = np.full((height, width), 205, np.uint8)
+    cx, cy = width // 2 + width // 60, height // 2 - height // 90
+
+    cv2.circle(image, (cx, cy), int(pupil_radius * 2.8), 110, -1)
+    for angle in np.radians(np.arange(0, 360, 7)):
+        direction = np.array([np.cos(angle), np.sin(angle)])
+        start = (np.array([cx, cy]) + direction * pupil_radius * 1.1).astype(int)
+        end = (np.array([cx, cy]) + direction * pupil_radius * 2.7).astype(int)
+        cv2.line(image, tuple(start.tolist()), tuple(end.tolist()), 90, max(1, pupil_radius // 40))
+    cv2.circle(image, (cx, cy), pupil_radius, 15, -1)
+    image = np.clip(image + rng.normal(0, 6, image.shape), 0, 255).astype(np.uint8)
+
+    if textured:
+        shading = cv2.resize(rng.normal(0, 1, (height // 50, width // 50)).astype(np.float32),
+                             (width, height), interpolation=cv2.INTER_CUBIC)
+        image = np.clip(image.astype(np.float32) + shading * 25, 0, 255)
+        for _ in range(60):
+            x = int(rng.uniform(0, width))
+            if rng.random() < 0.5:
+                y = int(rng.uniform(0, height * 0.15))
+            else:
+                y = int(rng.uniform(height * 0.85, height))
+            cv2.line(image, (x, y), (x + int(rng.normal(0, 40)), y + int(rng.normal(0, 80))),
+                     20, max(2, pupil_radius // 30))
+        grain = cv2.GaussianBlur(rng.normal(0, 12, (height, width)).astype(np.float32), (0, 0), 1.5)
+        image = np.clip(image + grain * 2, 0, 255).astype(np.uint8)
+
+    return image, (cx, cy)
+
+
+def make_colour_eye(seed: int = 0, width: int = 1200, height: int = 900) -> np.ndarray:
+    """
+    Draw a BGR eye with a blue-grey iris: radial fibres, three nerve rings,
+    scattered dark spots, a pupil of radius 95 and a glare spot on it.
+    """
+    rng = np.random.default_rng(seed)
+    image = np.full((height, width, 3), (200, 205, 215), np.uint8)
+    cx, cy = width // 2 + 20, height // 2 - 10
+
+    cv2.circle(image, (cx, cy), 300, (140, 110, 70), -1)
+    for angle in np.radians(np.arange(0, 360, 7)):
+        start = (int(cx + 100 * np.cos(angle)), int(cy + 100 * np.sin(angle)))
+        end = (int(cx + 290 * np.cos(angle)), int(cy + 290 * np.sin(angle)))
+        cv2.line(image, start, end, (110, 90, 60), 2)
+    for radius in (160, 200, 240):
+        cv2.circle(image, (cx, cy), radius, (90, 70, 50), 2)
+    for _ in range(40):
+        x, y = rng.integers(cx - 250, cx + 250), rng.integers(cy - 250, cy + 250)
+        cv2.circle(image, (int(x), int(y)), int(rng.integers(3, 9)), (30, 30, 30), -1)
+    cv2.circle(image, (cx, cy), 95, (15, 15, 15), -1)
+    cv2.circle(image, (cx - 40, cy - 60), 18, (255, 255, 255), -1)
+
+    return np.clip(image + rng.normal(0, 6, image.shape), 0, 255).astype(np.uint8)
+
+
+@pytest.fixture(scope="session")
+def processor():
+    from app.services.image_processor import IrisImageProcessor
+    return IrisImageProcessor()
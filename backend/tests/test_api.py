@@ -0,0 +1,104 @@
+"""Analysis endpoints through the ASGI app, with the doctor agents faked."""
+
+import cv2
+import pytest
+from fastapi.testclient import TestClient
+
+from app import db, main
+from app.routers import analysis
+
+from .conftest import make_colour_eye
+
+
+class FakeAgentManager:
+    """Stands in for IridologyAgentManager and counts the analyses asked of it."""
+
+    peczely_agent = jensen_agent = morse_agent = None
+
+    def __init__(self):
+        self.calls = 0
+
+    async def analyze_all(self, **case):
+        self.calls += 1
+        return {doctor: {"doctor": doctor, "findings": [case["patient_name"]]}
+                for doctor in analysis.ALL_DOCTORS}
+
+
+@pytest.fixture(scope="module")
+def agents():
+    return FakeAgentManager()
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory, agents):
+    data_dir = tmp_path_factory.mktemp("data")
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv("CV_WORKERS", "1")
+        patch.setattr(db, "LEGACY_PATIENTS_FILE", data_dir / "patients.json")
+        patch.setattr(main, "init_db", lambda: db.init_db(data_dir / "patients.db"))
+        patch.setattr(analysis, "get_agent_manager", lambda: agents)
+        with TestClient(main.app) as client:
+            yield client
+
+
+@pytest.fixture(scope="module")
+def eye_jpeg():
+    return cv2.imencode(".jpg", make_colour_eye(0), [cv2.IMWRITE_JPEG_QUALITY, 92])[1].tobytes()
+
+
+def test_repeat_analysis_is_served_from_cache(client, agents, eye_jpeg):
+    def analyze(notes):
+        return client.post("/api/analysis/analyze", data={"patient_name": "Cache", "notes": notes},
+                           files={"left_iris": ("left.jpg", eye_jpeg, "image/jpeg")})
+
+    first = analyze("tired")
+    assert first.status_code == 200
+    calls = agents.calls
+
+    again = analyze("tired")
+    assert again.status_code == 200
+    assert again.json() == first.json()
+    assert agents.calls == calls
+
+    # Different notes make a different prompt
+    assert analyze("headaches").status_code == 200
+    assert agents.calls == calls + 1
+
+
+@pytest.mark.parametrize("path, data", [
+    ("/api/analysis/annotate-image", {"eye_side": "left"}),
+    ("/api/analysis/crop-iris", {}),
+    ("/api/analysis/preprocess-image", {"eye_side": "left"}),
+])
+def test_display_image_not_modified(client, eye_jpeg, path, data):
+    files = {"iris_image": ("eye.jpg", eye_jpeg, "image/jpeg")}
+    first = client.post(path, data=data, files=files)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    again = client.post(path, data=data, files=files, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["ETag"] == etag
+
+    changed = client.post(path, data=data, files=files, headers={"If-None-Match": '"something-else"'})
+    assert changed.status_code == 200
+
+
+def test_oversized_upload_rejected(client):
+    oversized = b"\xff" * (analysis.MAX_UPLOAD_BYTES + 1)
+    response = client.post("/api/analysis/process-image", data={"eye_side": "left"},
+                           files={"iris_image": ("huge.jpg", oversized, "image/jpeg")})
+    assert response.status_code == 413
+
+
+def test_oversized_batch_rejected(client, agents, eye_jpeg, monkeypatch):
+    monkeypatch.setattr(analysis, "MAX_BATCH_BYTES", len(eye_jpeg) * 2)
+    calls = agents.calls
+    manifest = '[{"patient_name": "A", "left_iris": "a.jpg", "right_iris": "b.jpg"},' \
+               ' {"patient_name": "B", "left_iris": "c.jpg"}]'
+    files = [("files", (name, eye_jpeg, "image/jpeg")) for name in ("a.jpg", "b.jpg", "c.jpg")]
+
+    response = client.post("/api/analysis/analyze-batch", data={"manifest": manifest}, files=files)
+    assert response.status_code == 413
+    assert agents.calls == calls
@@ -0,0 +1,99 @@
+"""
+Feature extraction against the original, unoptimized implementation.
+
+data/original_features.json holds what the original extractors returned for
+two synthetic eyes and two of the reference charts, given the iris geometry
+stored with them. Detection and preprocessing have changed on purpose (and
+detection has its own tests), so both are held fixed here and only the
+extractors are compared.
+"""
+
+import json
+from pathlib import Path
+
+import cv2
+import pytest
+
+from .conftest import make_colour_eye
+
+ORIGINAL = json.loads((Path(__file__).parent / "data" / "original_features.json").read_text())
+CHARTS = Path(__file__).parents[1] / "app" / "knowledge" / "reference_charts"
+EYES = [case for case in ORIGINAL if case.startswith("eye-")]
+
+# Features whose computation was reorganized without changing the result
+UNCHANGED = ("dominant_color", "color_distribution", "pupil_size_ratio", "collarette_regularity",
+             "nerve_rings_count", "radial_furrows", "overall_density", "brightness_analysis")
+
+
+def _load(case: str):
+    if case.startswith("eye-"):
+        return make_colour_eye(int(case[len("eye-"):]))
+    return cv2.imread(str(CHARTS / case))
+
+
+def _approx(value):
+    """Expected value with its floats compared to within rounding."""
+    if isinstance(value, dict):
+        return {key: _approx(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_approx(item) for item in value]
+    if isinstance(value, float):
+        return pytest.approx(value, rel=1e-9, abs=1e-9)
+    return value
+
+
+def _extract(processor, monkeypatch, case: str):
+    iris_info = ORIGINAL[case]["iris_info"]
+    geometry = {**iris_info, "center": tuple(iris_info["center"])}
+    monkeypatch.setattr(processor, "_detect_iris", lambda gray, image: dict(geometry))
+    return processor.extract_features(_load(case), "left", remove_glare=False, enhance=False)
+
+
+@pytest.mark.parametrize("case", list(ORIGINAL))
+def test_unchanged_features_match(processor, monkeypatch, case):
+    features = _extract(processor, monkeypatch, case)
+    expected = ORIGINAL[case]
+
+    for name in UNCHANGED:
+        assert features[name] == _approx(expected[name]), name
+    assert features["lymphatic_signs"]["scurf_rim_present"] == expected["lymphatic_signs"]["scurf_rim_present"]
+
+
+@pytest.mark.parametrize("case", EYES)
+def test_zones_within_a_grey_level_or_two(processor, monkeypatch, case):
+    features = _extract(processor, monkeypatch, case)
+
+    # Zones are reduced from the polar unwrap rather than pie-slice masks.
+    # 9:00 is left out: the original's covered 15-345 degrees.
+    for clock_pos, original in ORIGINAL[case]["zone_analysis"].items():
+        if clock_pos == "9:00":
+            continue
+        zone = features["zone_analysis"][clock_pos]
+        assert zone["mean_brightness"] == pytest.approx(original["mean_brightness"], abs=1.0), clock_pos
+        assert zone["variability"] == pytest.approx(original["variability"], abs=2.5), clock_pos
+        assert zone["condition"] == original["condition"], clock_pos
+
+
+@pytest.mark.parametrize("case", EYES)
+def test_markings_still_found(processor, monkeypatch, case):
+    features = _extract(processor, monkeypatch, case)
+
+    # Blob areas are pixel counts now, which can move a spot's size class
+    # (and so its type) and let a few more spots in; the centroid of an
+    # irregular blob can also move a few pixels. Each original marking should
+    # still be there, in the same place on the chart.
+    found = features["detected_markings"]
+    for original in ORIGINAL[case]["detected_markings"]:
+        assert any(
+            marking["intensity"] == original["intensity"]
+            and marking["clock_position"] == original["clock_position"]
+            and marking["zone"] == original["zone"]
+            and abs(marking["position"]["x"] - original["position"]["x"]) <= 10
+            and abs(marking["position"]["y"] - original["position"]["y"]) <= 10
+            for marking in found
+        ), original
+
+    # ...and the rosary count changes with them, but not its reading
+    lymphatic, original = features["lymphatic_signs"], ORIGINAL[case]["lymphatic_signs"]
+    assert lymphatic["lymphatic_congestion_level"] == original["lymphatic_congestion_level"]
+    assert lymphatic["rosary_present"] == original["rosary_present"]
@@ -0,0 +1,31 @@
+"""Pupil detection on large images, where it runs on a downscaled copy first."""
+
+import pytest
+
+from .conftest import make_iris_image
+
+
+@pytest.mark.parametrize("width, height, pupil_radius, textured", [
+    # Pupils just above the full-resolution size floor (min side / 20)
+    (4000, 3000, 114, False),
+    (4000, 3000, 114, True),
+    (4000, 3000, 120, True),
+    (2000, 1500, 57, False),
+    # ...and just below it, where Hough finds the iris edge first. (On the
+    # textured images Hough finds mostly eyelash and shading edges, so those
+    # are only used where the darkness search decides.)
+    (4000, 3000, 107, False),
+    # Comfortably sized, and an image small enough not to be downscaled
+    (4000, 3000, 260, False),
+    (3000, 2000, 180, False),
+    (500, 400, 40, False),
+])
+@pytest.mark.parametrize("seed", [0, 1])
+def test_pupil_found_at_full_resolution(processor, width, height, pupil_radius, textured, seed):
+    gray, (cx, cy) = make_iris_image(width, height, pupil_radius, seed, textured)
+
+    iris_info = processor._detect_iris(gray, None)
+
+    found_x, found_y = iris_info["center"]
+    assert abs(found_x - cx) <= 3 and abs(found_y - cy) <= 3
+    assert abs(iris_info["pupil_radius"] - pupil_radius) <= 3
@@ -0,0 +1,14 @@
+"""Clock-position zones over the polar unwrap."""
+
+import numpy as np
+
+
+def test_every_zone_covers_thirty_degrees(processor):
+    for clock_pos, rows in processor._zone_rays.items():
+        assert len(rows) == 31, clock_pos
+
+
+def test_nine_oclock_zone_wraps_through_zero(processor):
+    # Zone angles run counterclockwise; unwrap rows are (360 - angle) % 360
+    angles = (360 - processor._zone_rays["9:00"]) % 360
+    assert sorted(angles) == sorted(list(range(345, 360)) + list(range(0, 16)))
@@ -175,6 +175,7 @@ export async function getAnnotatedImage(
   const response = await axios.post(`${API_BASE}/analysis/annotate-image`, formData, {
     headers: {
       'Content-Type': 'multipart/form-data',
+      Accept: 'image/webp,image/jpeg',
     },
     responseType: 'blob',
   })
@@ -197,6 +198,7 @@ export async function getPreprocessedImage(
   const response = await axios.post(`${API_BASE}/analysis/preprocess-image`, formData, {
     headers: {
       'Content-Type': 'multipart/form-data',
+      Accept: 'image/webp,image/jpeg',
     },
     responseType: 'blob',
   })